@@ -2,9 +2,14 @@ import streamlit as st
 import os
 from pathlib import Path
 from typing import Dict, List
+import asyncio
+import glob
+import hashlib
 import logging
+import shutil
 import subprocess
-from pydub import AudioSegment
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
 # First Streamlit command must be set_page_config
 st.set_page_config(
@@ -15,69 +20,223 @@ st.set_page_config(
 
 from core.pdf_parser import DocumentParser
 from core.llm import LLMService, Message
+from core.audio_transcriber import SimpleAudioTranscriber
 from utils.config_loader import load_config
 
+# diskcache为可选依赖：缺失时退化为进程内字典缓存
+try:
+    import diskcache
+except ImportError:
+    diskcache = None
+
 # 设置日志
 logging.basicConfig(level=logging.INFO)
 log = logging.getLogger(__name__)
 
-def init_services():
-    """初始化所有服务"""
-    try:
-        config = load_config()
-        doc_parser = DocumentParser()
-        llm_service = LLMService(config)
-        return config, doc_parser, llm_service
-    except Exception as e:
-        st.error(f"服务初始化失败: {str(e)}")
-        return None, None, None
+# 文档解析结果缓存（按内容哈希），重复上传跨会话也能命中
+_parse_cache = diskcache.Cache(".parse_cache") if diskcache is not None else {}
+
+# 单次并发调用Groq转录API的最大线程数
+MAX_TRANSCRIBE_WORKERS = 5
+
+# 文档上传控件接受的扩展名，模块加载时计算一次；
+# 音频格式走独立的音频上传区，不在此列
+DOC_UPLOAD_TYPES = sorted(
+    ext.lstrip('.')
+    for ext in DocumentParser.ALL_EXTENSIONS - {'.mp3', '.wav', '.m4a', '.ogg'}
+)
+
+# 会议纪要模板的缓存标识：模板内容变更时同步递增版本号，
+# 避免复用按旧模板生成的结果
+MEETING_MINUTES_TEMPLATE_ID = "meeting_minutes_v1"
+
+# 会议纪要生成的静态提示词。固定内容放在system消息且位于最前，
+# 动态会议内容单独放在user消息末尾，使网关/模型侧的前缀KV缓存
+# 能够复用这~2KB模板token，降低首token延迟和费用。
+MEETING_MINUTES_SYSTEM_PROMPT = """
+## Context:
+本次任务的目标是根据提供的多种来源（会议备注、相关文档、音频转录）的原始信息，自动化生成一份结构清晰、内容准确、格式标准的正式会议纪要。
+这份纪要将用于官方记录、信息同步和任务跟进。
+
+## Role:
+你是一位专业的 AI 会议纪要助手，擅长从非结构化文本中提取关键信息，并将其组织成专业、规范的会议纪要文档。
+
+## INSTRUCTIONS (PROCESSING STEPS):
+
+请按照以下步骤分析和处理用户提供的输入数据：
+1.  提取基本信息 (Extraction): 识别并整合会议的基础要素：会议名称/主题、时间、地点、主持人、参会人员名单。
+2.  归纳议题与讨论 (Summarization & Analysis): 识别会议讨论的核心议题。对每个议题，总结关键讨论点、主要观点（包括共识与分歧）以及最终结论或状态。
+3.  整理会议决定 (Decision Collation): 筛选并清晰记录所有达成的明确决策。
+4.  梳理行动计划 (Action Item Identification): 提取所有分配的具体任务，明确负责人、截止日期（若有）和关键要求。
+## GOAL (OUTPUT REQUIREMENTS):
+你的最终输出必须是一份符合以下格式和约束条件的会议纪要：
+
+1. 输出格式 (Strict Template):
+请严格遵循以下纯文本模板，不要添加任何 Markdown 标记或其他格式符号。
+
+--- BEGIN OUTPUT TEMPLATE ---
+
+[会议名称]会议纪要
+
+一、会议基本信息
+    时间：[提取或推断的会议日期和时间]
+    地点：[提取的会议地点]
+    主持人：[提取的主持人姓名及部门]
+    参会人员：[提取的参会人员姓名及部门列表，用逗号分隔]
+
+二、主要议题及讨论内容
+    （一）[议题1标题]
+        讨论概要：[简述议题1的关键讨论点、主要观点、共识与分歧]
+        议题结论：[明确议题1的结论或当前状态]
+
+    （二）[议题2标题]
+        讨论概要：[简述议题2的关键讨论点、主要观点、共识与分歧]
+        议题结论：[明确议题2的结论或当前状态]
+
+    [...] <根据实际议题数量调整>
+
+三、会议决定
+    1. [决定1：清晰、可执行的描述]
+    2. [决定2：清晰、可执行的描述]
+    [...] <根据实际决定数量调整，如无则写“无”>
+
+四、任务计划（行动项）
+    1. [任务1描述]
+    2. [任务2描述]
+    [...] <根据实际任务数量调整，如无则写“无”>
+--- END OUTPUT TEMPLATE ---
+
+2. 内容与风格约束 (Content & Style Constraints):
+*   准确性: 内容必须基于提供的输入信息，忠实反映会议情况。
+*   信息缺失处理: 若输入信息不足以填充模板中的某个字段（如具体时间、负责人），请使用 `[待明确]` 作为占位符。不得臆测信息。
+*   专业性: 使用客观、中立、正式的商业书面语言。
+*   简洁性: 在保证信息完整的前提下，力求语言精练。
+*   格式纯净: 严格输出纯文本，无任何额外格式符号。
+"""
+
+@st.cache_resource
+def get_services():
+    """初始化所有服务
+
+    用st.cache_resource缓存，服务实例在Streamlit重跑（每次控件交互）
+    之间复用，避免反复读取配置、重建MarkItDown和Groq客户端。
+    初始化异常直接抛出：st.cache_resource不缓存抛异常的调用，
+    下次重跑会重新初始化，瞬时故障（网络抖动、配置已修复）可自愈。
+    """
+    config = load_config()
+    doc_parser = DocumentParser()
+    llm_service = LLMService(config)
+    audio_transcriber = SimpleAudioTranscriber(config)
+    return config, doc_parser, llm_service, audio_transcriber
 
 def save_uploaded_document(uploaded_file, directory: str) -> str:
-    """保存上传的文档文件并返回保存路径"""
+    """保存上传的文档文件并返回保存路径
+
+    按1MB块流式写入磁盘，避免getbuffer()把整个文件（最大50MB）驻留内存。
+    每个文档保存在独立子目录中：同一批里两个同名不同内容的文件
+    不会互相覆盖——覆盖会让先保存文件的内容哈希指向后保存文件的
+    字节，错误解析结果进而被持久写入.parse_cache污染后续会话。
+    """
     if not os.path.exists(directory):
         os.makedirs(directory)
-    file_path = os.path.join(directory, uploaded_file.name)
+    doc_dir = tempfile.mkdtemp(prefix="doc_", dir=directory)
+    file_path = os.path.join(doc_dir, uploaded_file.name)
+    uploaded_file.seek(0)
     with open(file_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
+        shutil.copyfileobj(uploaded_file, f, 1024 * 1024)
     return file_path
 
-def convert_to_wav(src_path, dst_path):
-    subprocess.run([
-        "ffmpeg", "-y", "-i", src_path, "-ar", "16000", "-ac", "1", dst_path
-    ], check=True)
-
-def split_wav_to_chunks(wav_path, max_size_mb=35, max_chunk_minutes=9):
-    """将wav按时长分割成多个小于max_size_mb的文件，优先按时长分段"""
-    audio = AudioSegment.from_wav(wav_path)
-    chunk_length_ms = max_chunk_minutes * 60 * 1000  # 9分钟一段
-    chunks = []
-    for i, start in enumerate(range(0, len(audio), chunk_length_ms)):
-        chunk = audio[start:start+chunk_length_ms]
-        chunk_path = wav_path.rsplit('.', 1)[0] + f"_part{i+1}.wav"
-        chunk.export(chunk_path, format="wav")
-        # 再次确保分段后每段都小于max_size_mb
-        if os.path.getsize(chunk_path) > max_size_mb * 1024 * 1024:
-            raise ValueError(f"音频分段后单段仍超过{max_size_mb}MB，请上传更短音频")
-        chunks.append(chunk_path)
-    return chunks
 
-def save_uploaded_file(uploaded_file, directory: str) -> list:
-    """保存上传的文件并返回wav路径列表（如需分段则返回多个）"""
+def file_content_hash(file_path: str) -> str:
+    """流式计算文件内容哈希，用作上传去重和解析缓存的键"""
+    hasher = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+def save_uploaded_file(uploaded_file, directory: str, max_size_mb=35, max_chunk_minutes=9) -> list:
+    """把上传的音频转码并分段为wav，返回分段路径列表
+
+    流式容器（wav/mp3/ogg）的上传字节经stdin直接管道进ffmpeg
+    （-i pipe:0），重采样、降混、分段一次完成，不再先把原始上传落盘
+    再由ffmpeg读回，省掉一次完整大小的磁盘写+读。m4a例外：MP4容器的
+    moov atom常位于文件尾（非faststart录音），demuxer需要可seek的
+    输入，管道会以"moov atom not found"失败，只能先落盘再转码。
+    无论多大都分段，保证每段都小于API限制。
+    """
     if not os.path.exists(directory):
         os.makedirs(directory)
-    file_path = os.path.join(directory, uploaded_file.name)
-    with open(file_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
-    ext = os.path.splitext(file_path)[1].lower()
-    if ext in ['.mp3', '.m4a', '.ogg']:
-        wav_path = file_path.rsplit('.', 1)[0] + '.wav'
-        convert_to_wav(file_path, wav_path)
-    elif ext == '.wav':
-        wav_path = file_path
-    else:
+    ext = os.path.splitext(uploaded_file.name)[1].lower()
+    if ext not in ['.mp3', '.m4a', '.ogg', '.wav']:
         raise ValueError("不支持的音频格式")
-    # 无论多大都分段，保证每段都小于API限制
-    return split_wav_to_chunks(wav_path, max_size_mb=35, max_chunk_minutes=9)
+
+    # 每个上传独占一个子目录，分段用固定文件名：用户文件名不进入
+    # ffmpeg输出模板（%会被当作格式占位符）和glob模式（[]是通配符），
+    # 并发上传同名文件也不会互相覆盖或串读分段
+    segment_dir = tempfile.mkdtemp(prefix="segments_", dir=directory)
+    out_pattern = os.path.join(segment_dir, "part%03d.wav")
+    uploaded_file.seek(0)
+    if ext == '.m4a':
+        src_path = os.path.join(segment_dir, "input" + ext)
+        with open(src_path, "wb") as f:
+            shutil.copyfileobj(uploaded_file, f, 1024 * 1024)
+        ffmpeg_input, stdin = src_path, None
+    else:
+        ffmpeg_input, stdin = "pipe:0", subprocess.PIPE
+    process = subprocess.Popen([
+        "ffmpeg", "-y", "-i", ffmpeg_input, "-ar", "16000", "-ac", "1",
+        "-f", "segment", "-segment_time", str(max_chunk_minutes * 60),
+        "-c:a", "pcm_s16le", out_pattern
+    ], stdin=stdin)
+    if stdin is not None:
+        try:
+            shutil.copyfileobj(uploaded_file, process.stdin, 1024 * 1024)
+            process.stdin.close()
+        except BrokenPipeError:
+            # ffmpeg已退出（如输入损坏），由返回码统一报错
+            pass
+    returncode = process.wait()
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, "ffmpeg")
+
+    chunks = sorted(glob.glob(os.path.join(glob.escape(segment_dir), "part*.wav")))
+    if not chunks:
+        raise ValueError(f"音频转码未产生任何分段: {uploaded_file.name}")
+    # 确保每段都小于max_size_mb
+    for chunk_path in chunks:
+        if os.path.getsize(chunk_path) > max_size_mb * 1024 * 1024:
+            raise ValueError(f"音频分段后单段仍超过{max_size_mb}MB，请上传更短音频")
+    return chunks
+
+async def process_audio_files(audio_transcriber, uploaded_audios, directory: str) -> list:
+    """音频处理流水线：并发转码分段，再限流并发转录，按顺序返回结果
+
+    ffmpeg子进程等待和Groq API往返都是可重叠的I/O等待：先用
+    asyncio.to_thread并发跑各文件的转码+分段，拿到全部分段后再以
+    信号量限制并发数提交转录，避免触碰API并发配额。
+    单段转录失败不影响其他分段，失败项返回错误信息字符串。
+    """
+    save_tasks = [
+        asyncio.to_thread(save_uploaded_file, audio, directory)
+        for audio in uploaded_audios
+    ]
+    chunk_lists = await asyncio.gather(*save_tasks)
+    chunk_paths = [path for chunks in chunk_lists for path in chunks]
+
+    semaphore = asyncio.Semaphore(MAX_TRANSCRIBE_WORKERS)
+
+    async def transcribe_bounded(index: int, path: str):
+        async with semaphore:
+            try:
+                return await asyncio.to_thread(audio_transcriber.transcribe_audio, path)
+            except Exception as e:
+                log.error(f"Chunk {index} transcription failed: {e}")
+                return f"Error: transcription failed for chunk {index + 1}: {e}"
+
+    return list(await asyncio.gather(
+        *(transcribe_bounded(i, path) for i, path in enumerate(chunk_paths))
+    ))
 
 def main():
     # Create left-right layout
@@ -87,8 +246,10 @@ def main():
         st.title("📝 会议纪要生成器")
         
         # 初始化服务
-        config, doc_parser, llm_service = init_services()
-        if not all([config, doc_parser, llm_service]):
+        try:
+            config, doc_parser, llm_service, audio_transcriber = get_services()
+        except Exception as e:
+            st.error(f"服务初始化失败: {str(e)}")
             return
 
         # 创建临时文件夹
@@ -103,16 +264,19 @@ def main():
         st.header("📁 上传文档")
         st.info("支持上传最多15个文档，每个最大50MB")
         
-        # 展平支持的格式列表并创建唯一集合
-        supported_formats = []
-        for formats in doc_parser.SUPPORTED_FORMATS.values():
-            supported_formats.extend(formats)
-        supported_formats = list(set(supported_formats))
-        
         uploaded_docs = st.file_uploader(
             "选择文档文件",
             accept_multiple_files=True,
-            type=supported_formats
+            type=DOC_UPLOAD_TYPES
+        )
+
+        # 音频上传区
+        st.header("🎤 上传录音")
+        st.info("支持 mp3/wav/m4a/ogg 格式，自动分段转录")
+        uploaded_audios = st.file_uploader(
+            "选择音频文件",
+            accept_multiple_files=True,
+            type=['mp3', 'wav', 'm4a', 'ogg']
         )
 
     with right_col:
@@ -120,8 +284,8 @@ def main():
         
         # 处理按钮
         if st.button("生成会议纪要", use_container_width=True):
-            if not uploaded_docs and not meeting_content:
-                st.warning("请至少提供一种会议内容（文档或备注）")
+            if not uploaded_docs and not uploaded_audios and not meeting_content:
+                st.warning("请至少提供一种会议内容（文档、音频或备注）")
                 return
 
             # 验证文件数量和大小
@@ -135,27 +299,55 @@ def main():
                     return
 
             with st.spinner("正在处理文件..."):
-                # 处理文档
+                # 处理文档：按内容哈希去重并查解析缓存，
+                # 剩余未命中的再用线程池并发解析（解析以文件I/O为主）。
+                # 先全部落盘再统一解析依赖save_uploaded_document保证
+                # 路径唯一：哈希计算到解析完成之间文件不会被同批
+                # 同名上传覆盖，否则解析缓存会记下错误的哈希→文本映射
                 meeting_file = []
-                for doc in uploaded_docs:
-                    file_path = save_uploaded_document(doc, str(temp_dir))
-                    result = doc_parser.parse_document(file_path)
-                    if not result.get("error"):
-                        meeting_file.append(result["text_content"])
-
-            # 生成会议纪要prompt
-            prompt = f"""
-## Context:
-本次任务的目标是根据提供的多种来源（会议备注、相关文档）的原始信息，自动化生成一份结构清晰、内容准确、格式标准的正式会议纪要。
-这份纪要将用于官方记录、信息同步和任务跟进。
-
-## Role:
-你是一位专业的 AI 会议纪要助手，擅长从非结构化文本中提取关键信息，并将其组织成专业、规范的会议纪要文档。
-
-## Input Data:
-你将接收到以下格式的文本信息：
-
---- BEGIN INPUT ---
+                if uploaded_docs:
+                    seen = set()
+                    unique_docs = []  # [(内容哈希, 路径)]
+                    for doc in uploaded_docs:
+                        path = save_uploaded_document(doc, str(temp_dir))
+                        content_hash = file_content_hash(path)
+                        if content_hash in seen:
+                            log.info(f"Skipping duplicate document: {doc.name}")
+                            continue
+                        seen.add(content_hash)
+                        unique_docs.append((content_hash, path))
+
+                    to_parse = [(h, path) for h, path in unique_docs if h not in _parse_cache]
+                    if to_parse:
+                        workers = min(len(to_parse), os.cpu_count() or 1)
+                        with ThreadPoolExecutor(max_workers=workers) as executor:
+                            parse_results = list(executor.map(
+                                doc_parser.parse_document, [path for _, path in to_parse]
+                            ))
+                        for (content_hash, _), result in zip(to_parse, parse_results):
+                            if not result.get("error"):
+                                _parse_cache[content_hash] = result["text_content"]
+
+                    meeting_file = [_parse_cache[h] for h, _ in unique_docs if h in _parse_cache]
+
+                # 处理音频：转码分段与转录在asyncio流水线中并发执行
+                meeting_audio = []
+                if uploaded_audios:
+                    try:
+                        results = asyncio.run(
+                            process_audio_files(audio_transcriber, uploaded_audios, str(temp_dir))
+                        )
+                    except (ValueError, subprocess.CalledProcessError) as e:
+                        st.error(f"音频处理失败: {e}")
+                        return
+
+                    failed = [r for r in results if not isinstance(r, dict)]
+                    if failed:
+                        st.warning(f"{len(failed)}/{len(results)} 个音频分段转录失败，结果可能不完整")
+                    meeting_audio = [r['text'] for r in results if isinstance(r, dict)]
+
+            # 动态会议内容放在user消息，静态模板走system消息
+            user_message = f"""--- BEGIN INPUT ---
 
 **# 会议备注:**
 {meeting_content if meeting_content else '无内容'}
@@ -163,85 +355,49 @@ def main():
 **# 文档内容:**
 {' '.join(meeting_file) if meeting_file else '无内容'}
 
-## INSTRUCTIONS (PROCESSING STEPS):
-
-请按照以下步骤分析和处理上述输入数据：
-1.  提取基本信息 (Extraction): 识别并整合会议的基础要素：会议名称/主题、时间、地点、主持人、参会人员名单。
-2.  归纳议题与讨论 (Summarization & Analysis): 识别会议讨论的核心议题。对每个议题，总结关键讨论点、主要观点（包括共识与分歧）以及最终结论或状态。
-3.  整理会议决定 (Decision Collation): 筛选并清晰记录所有达成的明确决策。
-4.  梳理行动计划 (Action Item Identification): 提取所有分配的具体任务，明确负责人、截止日期（若有）和关键要求。
-## GOAL (OUTPUT REQUIREMENTS):
-你的最终输出必须是一份符合以下格式和约束条件的会议纪要：
-
-1. 输出格式 (Strict Template):
-请严格遵循以下纯文本模板，不要添加任何 Markdown 标记或其他格式符号。
-
---- BEGIN OUTPUT TEMPLATE ---
-
-[会议名称]会议纪要
-
-一、会议基本信息
-    时间：[提取或推断的会议日期和时间]
-    地点：[提取的会议地点]
-    主持人：[提取的主持人姓名及部门]
-    参会人员：[提取的参会人员姓名及部门列表，用逗号分隔]
-
-二、主要议题及讨论内容
-    （一）[议题1标题]
-        讨论概要：[简述议题1的关键讨论点、主要观点、共识与分歧]
-        议题结论：[明确议题1的结论或当前状态]
-
-    （二）[议题2标题]
-        讨论概要：[简述议题2的关键讨论点、主要观点、共识与分歧]
-        议题结论：[明确议题2的结论或当前状态]
-
-    [...] <根据实际议题数量调整>
-
-三、会议决定
-    1. [决定1：清晰、可执行的描述]
-    2. [决定2：清晰、可执行的描述]
-    [...] <根据实际决定数量调整，如无则写“无”>
-
-四、任务计划（行动项）
-    1. [任务1描述]
-    2. [任务2描述]
-    [...] <根据实际任务数量调整，如无则写“无”>
---- END OUTPUT TEMPLATE ---
-
-2. 内容与风格约束 (Content & Style Constraints):
-*   准确性: 内容必须基于提供的输入信息，忠实反映会议情况。
-*   信息缺失处理: 若输入信息不足以填充模板中的某个字段（如具体时间、负责人），请使用 `[待明确]` 作为占位符。不得臆测信息。
-*   专业性: 使用客观、中立、正式的商业书面语言。
-*   简洁性: 在保证信息完整的前提下，力求语言精练。
-*   格式纯净: 严格输出纯文本，无任何额外格式符号。
+**# 音频转录内容:**
+{' '.join(meeting_audio) if meeting_audio else '无内容'}
 
+--- END INPUT ---
 """
 
-            with st.spinner("正在生成会议纪要..."):
-                # 调用LLM生成会议纪要
-                response = llm_service.chat_with_system(prompt)
-                
-                if not response.error:
-                    st.success("会议纪要生成成功！")
-                    st.text_area("生成的会议纪要", response.text, height=600)
-                    
-                    # 提供下载按钮
-                    st.download_button(
-                        label="💾 下载会议纪要",
-                        data=response.text,
-                        file_name="meeting_minutes.txt",
-                        mime="text/plain",
-                        use_container_width=True
+            # 模板+槽位缓存：同样的会议内容重复生成时直接复用结果
+            slots = {
+                "notes": meeting_content or "",
+                "docs": meeting_file,
+                "audio": meeting_audio
+            }
+            minutes_text = llm_service.template_cache_get(MEETING_MINUTES_TEMPLATE_ID, slots)
+            if minutes_text is not None:
+                st.write(minutes_text)
+            else:
+                # 流式生成：token一到即渲染，用户无需等完整响应
+                try:
+                    minutes_text = st.write_stream(
+                        llm_service.chat_with_system_stream(
+                            user_message,
+                            system_content=MEETING_MINUTES_SYSTEM_PROMPT
+                        )
                     )
-                else:
-                    st.error(f"生成会议纪要失败: {response.error}")
-
-    # 清理临时文件
-    for file in temp_dir.glob("*"):
-        try:
-            file.unlink()
-        except Exception as e:
-            log.warning(f"Failed to delete temporary file {file}: {e}")
+                except Exception as e:
+                    st.error(f"生成会议纪要失败: {e}")
+                    return
+                llm_service.template_cache_set(MEETING_MINUTES_TEMPLATE_ID, slots, minutes_text)
+
+            st.success("会议纪要生成成功！")
+
+            # 提供下载按钮
+            st.download_button(
+                label="💾 下载会议纪要",
+                data=minutes_text,
+                file_name="meeting_minutes.txt",
+                mime="text/plain",
+                use_container_width=True
+            )
+
+    # 清理临时文件：整目录一次删除，避免逐文件unlink的几十次系统调用
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    temp_dir.mkdir(exist_ok=True)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,6 +1,13 @@
 # core/audio_transcriber.py
 
 import os
+import glob
+import random
+import subprocess
+import tempfile
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
 # import time # 示例中不再记录时间，所以移除
 from groq import Groq, APIError
 import logging
@@ -11,47 +18,74 @@ log = logging.getLogger(__name__)
 # 这里只是获取 logger 实例。
 
 def seconds_to_srt_time(seconds: float) -> str:
-    """将浮点秒数转换为 SRT 时间格式"""
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    secs = int(seconds % 60)
-    millis = int((seconds % 1) * 1000)
-    return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
+    """将浮点秒数转换为 SRT 时间格式
+
+    先一次性转成整数毫秒再走divmod链，替代原来的四次浮点取模/整除；
+    该函数在长转录中每段调用两次，是分段热路径的一部分。
+    """
+    millis = int(seconds * 1000)
+    hours, rem = divmod(millis, 3600_000)
+    minutes, rem = divmod(rem, 60_000)
+    secs, millis = divmod(rem, 1000)
+    return "%02d:%02d:%02d,%03d" % (hours, minutes, secs, millis)
 
 def generate_transcript_with_timestamps(words: list, max_duration: int = 7, max_chars: int = 30) -> dict:
-    """生成带时间戳的转录内容"""
+    """生成带时间戳的转录内容
+
+    先把词文本/起止时间/字长抽成平铺列表再做单次线性扫描，段内文本
+    在切分点用一次join拼出。相比逐词current_text += word的写法，
+    省掉了每词一次的字典哈希查找和字符串二次方复制，长转录
+    （数万词）下明显更快。
+    """
+    if not words:
+        return []
+
+    texts = [w["word"] for w in words]
+    starts = [w["start"] for w in words]
+    ends = [w["end"] for w in words]
+    lengths = [len(t) for t in texts]
+
     segments = []
-    current_text = ""
-    start_time = None
-    subtitle_index = 1
+    seg_start = 0  # 当前段第一个词的下标
+    seg_chars = 0
+    last = len(words) - 1
 
-    for i, word_info in enumerate(words):
-        if start_time is None:
-            start_time = word_info["start"]
-        
-        current_text += word_info["word"]
-        end_time = word_info["end"]
+    for i in range(len(words)):
+        seg_chars += lengths[i]
 
         should_split = (
-            (end_time - start_time > max_duration) or
-            (len(current_text) > max_chars) or
-            (i == len(words) - 1)
+            (ends[i] - starts[seg_start] > max_duration) or
+            (seg_chars > max_chars) or
+            (i == last)
         )
 
         if should_split:
             segments.append({
-                "index": subtitle_index,
-                "start_time": seconds_to_srt_time(start_time),
-                "end_time": seconds_to_srt_time(end_time),
-                "text": current_text.strip()
+                "index": len(segments) + 1,
+                "start_time": seconds_to_srt_time(starts[seg_start]),
+                "end_time": seconds_to_srt_time(ends[i]),
+                "text": "".join(texts[seg_start:i + 1]).strip()
             })
-            
-            subtitle_index += 1
-            current_text = ""
-            start_time = None if i == len(words) - 1 else words[i + 1]["start"]
+
+            seg_start = i + 1
+            seg_chars = 0
 
     return segments
 
+class _ChunkedPipeReader:
+    """只暴露read()的管道包装器，强制SDK走chunked传输上传
+
+    httpx通过fileno()的fstat大小或seek()/tell()探测multipart文件部分
+    的长度，而管道的fstat大小恒为0，直接传process.stdout会按空音频
+    声明Content-Length，请求必然被截断。隐藏这两个接口后长度解析为
+    None，httpx回退为chunked编码，边读管道边发送。
+    """
+    def __init__(self, pipe):
+        self._pipe = pipe
+
+    def read(self, size: int = -1) -> bytes:
+        return self._pipe.read(size)
+
 class SimpleAudioTranscriber:
     """
     使用 Groq API 将单个音频文件转录为文本。
@@ -102,12 +136,15 @@ class SimpleAudioTranscriber:
         log.info(f"Transcribing audio file: '{os.path.basename(audio_file_path)}'...")
 
         try:
-            with open(audio_file_path, "rb") as audio_file:
+            # 64KB缓冲的句柄直接交给HTTP客户端做分块流式上传：服务端在
+            # 上传进行中即可开始处理，峰值内存也只有一个缓冲块而非整个文件
+            with open(audio_file_path, "rb", buffering=64 * 1024) as audio_file:
                 transcription = self.client.audio.transcriptions.create(
-                    file=(audio_file_path, audio_file.read()),
-                    model="whisper-large-v3-turbo",
-                    temperature=0.15,
-                    language="zh",
+                    file=(os.path.basename(audio_file_path), audio_file, "audio/wav"),
+                    model=self.model,
+                    temperature=self.temperature,
+                    language=self.language,
+                    prompt=self.prompt,
                     response_format="verbose_json",
                     timestamp_granularities=["word"]
                 )
@@ -131,6 +168,154 @@ class SimpleAudioTranscriber:
             log.error(error_msg)
             return error_msg
 
+    def transcribe_many(self, audio_file_paths: list, max_concurrency: int = 4,
+                        max_retries: int = 4) -> list:
+        """批量转录多个文件，面向夜间/离线批处理场景的吞吐优化
+
+        Groq当前的转录端点是同步的，没有提交作业+轮询的异步批处理
+        通道；这里用有界并发+指数退避（base 1s、上限30s、带抖动）
+        逼近批处理吞吐：被限流(429)的文件退避后重试，不拖垮整批。
+        返回列表与输入顺序一致，失败项为错误信息字符串。
+        """
+        def transcribe_with_backoff(path):
+            delay = 1.0
+            for attempt in range(max_retries + 1):
+                result = self.transcribe_audio(path)
+                rate_limited = isinstance(result, str) and (
+                    "429" in result or "rate limit" in result.lower()
+                )
+                if not rate_limited or attempt == max_retries:
+                    return result
+                sleep_for = min(delay, 30.0) * (0.5 + random.random())
+                log.warning(
+                    f"Rate limited transcribing '{os.path.basename(path)}', "
+                    f"retrying in {sleep_for:.1f}s"
+                )
+                time.sleep(sleep_for)
+                delay *= 2
+            return result
+
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            return list(executor.map(transcribe_with_backoff, audio_file_paths))
+
+    def transcribe_audio_piped(self, src_audio_path: str) -> dict | str:
+        """边转码边上传：ffmpeg的输出经管道直接作为请求体
+
+        转码与上传重叠进行，并省掉中间文件的写盘+读回；当转换耗时与
+        上传耗时相当时，端到端接近2×提速。输出选FLAC而非WAV：WAV头
+        需要预先写入RIFF总长度，无法流式产生，FLAC头支持流式且无损。
+        """
+        if not os.path.exists(src_audio_path):
+            error_msg = f"Error: Audio file not found at '{src_audio_path}'."
+            log.error(error_msg)
+            return error_msg
+
+        log.info(f"Transcoding and streaming audio file: '{os.path.basename(src_audio_path)}'...")
+
+        process = subprocess.Popen([
+            "ffmpeg", "-v", "error", "-i", src_audio_path,
+            "-ar", "16000", "-ac", "1", "-f", "flac", "pipe:1"
+        ], stdout=subprocess.PIPE)
+
+        try:
+            transcription = self.client.audio.transcriptions.create(
+                file=(os.path.basename(src_audio_path) + ".flac",
+                      _ChunkedPipeReader(process.stdout), "audio/flac"),
+                model=self.model,
+                temperature=self.temperature,
+                language=self.language,
+                prompt=self.prompt,
+                response_format="verbose_json",
+                timestamp_granularities=["word"]
+            )
+        except APIError as e:
+            process.kill()
+            error_msg = f"Groq API Error during transcription: {str(e)}"
+            log.error(error_msg)
+            return error_msg
+        finally:
+            process.stdout.close()
+            process.wait()
+
+        if process.returncode != 0:
+            error_msg = f"Error: ffmpeg exited with code {process.returncode} while transcoding '{src_audio_path}'."
+            log.error(error_msg)
+            return error_msg
+
+        segments = generate_transcript_with_timestamps(transcription.words)
+
+        return {
+            'text': transcription.text,
+            'task': transcription.task,
+            'language': transcription.language,
+            'duration': transcription.duration,
+            'words': transcription.words,
+            'segments': segments,
+            'x_groq': transcription.x_groq
+        }
+
+    def transcribe_audio_chunked(self, audio_file_path: str, clip_seconds: int = 90,
+                                 max_concurrency: int = 8) -> dict | str:
+        """将长wav切成短段并发转录，合并为与transcribe_audio一致的结果
+
+        Groq允许并行提交转录任务：按clip_seconds切分后并发上传，
+        N分钟音频的总耗时约降为 时长/并发数。各段词级时间戳按
+        分段起点偏移后合并；短于clip_seconds或非wav的文件直接
+        退回单次转录。
+        """
+        if not os.path.exists(audio_file_path):
+            error_msg = f"Error: Audio file not found at '{audio_file_path}'."
+            log.error(error_msg)
+            return error_msg
+
+        try:
+            with wave.open(audio_file_path, 'rb') as wav:
+                duration = wav.getnframes() / wav.getframerate()
+        except (wave.Error, EOFError):
+            # 非wav或头部异常时不做切分
+            return self.transcribe_audio(audio_file_path)
+
+        if duration <= clip_seconds:
+            return self.transcribe_audio(audio_file_path)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            pattern = os.path.join(tmp_dir, "clip_%04d.wav")
+            subprocess.run([
+                "ffmpeg", "-y", "-i", audio_file_path,
+                "-f", "segment", "-segment_time", str(clip_seconds),
+                "-c", "copy", pattern
+            ], check=True)
+            clips = sorted(glob.glob(os.path.join(tmp_dir, "clip_*.wav")))
+
+            with ThreadPoolExecutor(max_workers=min(max_concurrency, len(clips))) as executor:
+                results = list(executor.map(self.transcribe_audio, clips))
+
+        # 任一段失败则整体返回该段的错误信息，与单次转录的契约一致
+        for result in results:
+            if not isinstance(result, dict):
+                return result
+
+        merged_words = []
+        for i, result in enumerate(results):
+            offset = i * clip_seconds
+            for word in result['words']:
+                merged_words.append({
+                    **word,
+                    'start': word['start'] + offset,
+                    'end': word['end'] + offset
+                })
+        merged_words.sort(key=lambda w: w['start'])
+
+        return {
+            'text': ''.join(result['text'] for result in results),
+            'task': results[0]['task'],
+            'language': results[0]['language'],
+            'duration': sum(result['duration'] for result in results),
+            'words': merged_words,
+            'segments': generate_transcript_with_timestamps(merged_words),
+            'x_groq': results[0]['x_groq']
+        }
+
 
 # --- 示例用法 (仅当直接运行此文件进行测试时执行) ---
 if __name__ == "__main__":
@@ -1,14 +1,44 @@
 import os
 import json
+import hashlib
 import logging
 from typing import Dict, List, Optional, Union
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dataclasses import dataclass
 from utils.config_loader import load_config
 
+# diskcache为可选依赖：缺失时退化为进程内字典缓存
+try:
+    import diskcache
+except ImportError:
+    diskcache = None
+
+# orjson为可选依赖：C实现的序列化，处理数KB模板文本明显快于stdlib json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # 获取logger
 log = logging.getLogger(__name__)
 
+# 缓存条目过期时间（秒）
+CACHE_EXPIRE_SECONDS = 3600
+
+def _json_dumps(payload) -> bytes:
+    """序列化请求体，优先使用orjson"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False).encode()
+
+def _json_loads(data):
+    """解析响应字节，优先使用orjson"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
 @dataclass
 class Message:
     """聊天消息的数据类"""
@@ -56,10 +86,91 @@ class LLMService:
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self.api_key}"
         }
-        
+
+        # 复用带连接池的Session：保持TCP/TLS长连接，避免每次请求
+        # 重新握手，同时支持并发请求复用连接。
+        # 对瞬时网关错误做指数退避重试：一次点击内透明恢复，
+        # 不必让用户重新上传解析再整体重试
+        retries = Retry(
+            total=4,
+            backoff_factor=0.5,
+            status_forcelist=[429, 502, 503, 504],
+            allowed_methods=["POST"],
+            respect_retry_after_header=True
+        )
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retries)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        # 响应缓存：相同模型+消息的重复请求直接返回缓存结果，
+        # 省掉整次HTTP往返和token费用
+        self.cache_enabled = xai_config.get('cache_enabled', True)
+        if diskcache is not None:
+            self._cache = diskcache.Cache(".llm_cache")
+        else:
+            log.info("diskcache not installed, falling back to in-memory LLM cache")
+            self._cache = {}
+
         log.info(f"LLM Service initialized with model: {self.model}")
 
-    def chat(self, 
+    def _cache_key(self, messages: List[Message], temperature, max_tokens, reasoning_effort) -> str:
+        """计算请求的缓存键（模型+消息+参数的SHA-256）"""
+        payload = {
+            "model": self.model,
+            "messages": [msg.__dict__ for msg in messages],
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "reasoning_effort": reasoning_effort
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+    def _template_key(self, template_id: str, slots: Dict) -> str:
+        """计算 模板ID+动态槽位 的缓存键"""
+        payload = {"template_id": template_id, "slots": slots}
+        return "tpl:" + hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+    def template_cache_get(self, template_id: str, slots: Dict) -> Optional[str]:
+        """
+        查询固定模板+动态槽位组合此前生成的文本
+
+        会议纪要这类提示词约七成token是固定模板，每次变化的只有少量
+        槽位内容。按(模板ID, 槽位哈希)缓存后，"改了一处又点重新生成"
+        之外的完全重复请求可以直接命中，跳过整次LLM调用。
+
+        Args:
+            template_id: 静态模板的标识（如 "meeting_minutes_v1"）
+            slots: 填入模板的动态内容字典
+
+        Returns:
+            命中时返回缓存的生成文本，否则返回None
+        """
+        if not self.cache_enabled:
+            return None
+        return self._cache.get(self._template_key(template_id, slots))
+
+    def template_cache_set(self, template_id: str, slots: Dict, text: str) -> None:
+        """缓存固定模板+动态槽位组合生成的文本"""
+        if not self.cache_enabled:
+            return
+        key = self._template_key(template_id, slots)
+        if diskcache is not None:
+            self._cache.set(key, text, expire=CACHE_EXPIRE_SECONDS)
+        else:
+            self._cache[key] = text
+
+    def close(self):
+        """关闭底层HTTP连接池"""
+        self.session.close()
+
+    def __del__(self):
+        try:
+            self.session.close()
+        except Exception:
+            pass
+
+    def chat(self,
             messages: List[Message],
             temperature: float = None,
             max_tokens: int = None,
@@ -77,6 +188,14 @@ class LLMService:
         Returns:
             ChatResponse对象，包含生成的文本和原始响应
         """
+        cache_key = None
+        if self.cache_enabled:
+            cache_key = self._cache_key(messages, temperature, max_tokens, reasoning_effort)
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                log.info("LLM cache hit, skipping API call")
+                return ChatResponse(**cached)
+
         try:
             payload = {
                 "messages": [msg.__dict__ for msg in messages],
@@ -85,19 +204,25 @@ class LLMService:
                 "max_tokens": max_tokens,
                 "reasoning_effort": reasoning_effort
             }
-            
-            response = requests.post(
+
+            response = self.session.post(
                 f"{self.base_url}/chat/completions",
-                headers=self.headers,
-                json=payload
+                data=_json_dumps(payload)
             )
-            
+
             response.raise_for_status()
-            result = response.json()
-            
+            result = _json_loads(response.content)
+
             # 提取生成的文本
             assistant_message = result["choices"][0]["message"]["content"]
-            
+
+            if cache_key is not None:
+                entry = {"text": assistant_message, "raw_response": result}
+                if diskcache is not None:
+                    self._cache.set(cache_key, entry, expire=CACHE_EXPIRE_SECONDS)
+                else:
+                    self._cache[cache_key] = entry
+
             return ChatResponse(
                 text=assistant_message,
                 raw_response=result
@@ -117,10 +242,82 @@ class LLMService:
             log.error(error_msg)
             return ChatResponse(
                 text="",
-                raw_response=response.json() if 'response' in locals() else {},
+                raw_response=_json_loads(response.content) if 'response' in locals() else {},
                 error=error_msg
             )
 
+    def chat_stream(self,
+            messages: List[Message],
+            temperature: float = None,
+            max_tokens: int = None,
+            reasoning_effort: str = None
+            ):
+        """
+        流式聊天接口，逐段产出生成的文本
+
+        与chat()相比不等待完整响应：首token一到即开始产出，
+        适合直接接到st.write_stream等增量渲染场景。
+
+        Args:
+            messages: 消息列表，每个消息包含role和content
+            temperature: 温度参数，控制随机性
+            max_tokens: 最大生成token数
+            reasoning_effort: 推理努力程度 ["low", "medium", "high"]
+
+        Yields:
+            str: 每次API推送的增量文本
+
+        Raises:
+            requests.exceptions.RequestException: 请求失败时抛出
+        """
+        payload = {
+            "messages": [msg.__dict__ for msg in messages],
+            "model": self.model,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "reasoning_effort": reasoning_effort,
+            "stream": True
+        }
+
+        response = self.session.post(
+            f"{self.base_url}/chat/completions",
+            data=_json_dumps(payload),
+            stream=True
+        )
+        response.raise_for_status()
+
+        for line in response.iter_lines():
+            if not line.startswith(b"data: "):
+                continue
+            data = line[len(b"data: "):]
+            if data == b"[DONE]":
+                break
+            chunk = _json_loads(data)
+            content = chunk["choices"][0]["delta"].get("content")
+            if content:
+                yield content
+
+    def chat_with_system_stream(self,
+            user_message: str,
+            system_content: str = None
+            ):
+        """
+        chat_with_system的流式版本
+
+        Args:
+            user_message: 用户输入的消息
+            system_content: 系统提示消息，如果不提供则使用配置文件中的默认值
+
+        Returns:
+            产出增量文本的生成器
+        """
+        messages = [
+            Message(role="system", content=system_content or self.system_content),
+            Message(role="user", content=user_message)
+        ]
+
+        return self.chat_stream(messages)
+
     def simple_chat(self, prompt: str) -> str:
         """
         简单的聊天接口，只需要提供prompt即可
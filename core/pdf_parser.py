@@ -1,7 +1,8 @@
 import os
+import importlib
 import logging
 from markitdown import MarkItDown
-from typing import Dict, Optional, List
+from typing import Dict, FrozenSet, Optional
 
 # 获取logger
 log = logging.getLogger(__name__)
@@ -12,37 +13,63 @@ class DocumentParser:
     支持格式包括：PDF、Word、PowerPoint、Excel、图片、音频等。
     """
 
-    # 支持的文件类型
+    # 支持的文件类型（frozenset保证O(1)成员判断且不可被调用方改动）
     SUPPORTED_FORMATS = {
-        'document': ['.pdf', '.doc', '.docx', '.rtf', '.txt'],
-        'spreadsheet': ['.xls', '.xlsx', '.csv'],
-        'presentation': ['.ppt', '.pptx'],
-        'image': ['.jpg', '.jpeg', '.png', '.gif', '.bmp'],
-        'audio': ['.mp3', '.wav', '.m4a', '.ogg'],
-        'archive': ['.zip', '.rar'],
-        'web': ['.html', '.htm'],
-        'data': ['.json', '.xml']
+        'document': frozenset({'.pdf', '.doc', '.docx', '.rtf', '.txt'}),
+        'spreadsheet': frozenset({'.xls', '.xlsx', '.csv'}),
+        'presentation': frozenset({'.ppt', '.pptx'}),
+        'image': frozenset({'.jpg', '.jpeg', '.png', '.gif', '.bmp'}),
+        'audio': frozenset({'.mp3', '.wav', '.m4a', '.ogg'}),
+        'archive': frozenset({'.zip', '.rar'}),
+        'web': frozenset({'.html', '.htm'}),
+        'data': frozenset({'.json', '.xml'})
     }
 
+    # 类定义时一次性反转成 扩展名→类型 的映射，get_file_type由
+    # 逐类别线性扫描变成O(1)哈希查找；调用方也无需每次重新展平列表
+    EXT_TO_TYPE = {ext: file_type for file_type, exts in SUPPORTED_FORMATS.items() for ext in exts}
+    ALL_EXTENSIONS = frozenset(EXT_TO_TYPE)
+
+    # MarkItDown惰性导入的重量级子解析器，启动时集中预热
+    _BACKEND_MODULES = ("pdfminer.high_level", "docx", "pptx", "openpyxl", "pytesseract")
+
     def __init__(self):
         """初始化文档解析器"""
         try:
             self.converter = MarkItDown()
+            self.warm()
             log.info("Document parser initialized successfully")
         except Exception as e:
             log.error(f"Failed to initialize document parser: {e}")
             raise RuntimeError(f"Failed to initialize document parser: {e}")
 
+    @classmethod
+    def warm(cls):
+        """预热重量级解析后端
+
+        MarkItDown在首次解析某类文档时才导入对应子解析器（pdfminer、
+        python-docx等），首个真实文档要多付数百毫秒的导入开销。
+        服务初始化时集中导入一次，把这部分延迟挪出用户请求路径。
+        """
+        for module in cls._BACKEND_MODULES:
+            try:
+                importlib.import_module(module)
+            except ImportError:
+                log.debug(f"Optional parser backend not available: {module}")
+
     def get_file_type(self, file_path: str) -> str:
         """
-        判断文件类型
+        判断文件类型：取末尾扩展名后做一次哈希查找
+
+        用str.rpartition直接截扩展名，省掉os.path.splitext的完整
+        路径解析；批量判型时每次调用只剩一次字典查找。
+
         Returns: 文件类型分类（document, spreadsheet, presentation等）
         """
-        ext = os.path.splitext(file_path)[1].lower()
-        for file_type, extensions in self.SUPPORTED_FORMATS.items():
-            if ext in extensions:
-                return file_type
-        return "unknown"
+        _, sep, ext = file_path.rpartition('.')
+        if not sep:
+            return "unknown"
+        return self.EXT_TO_TYPE.get('.' + ext.lower(), "unknown")
 
     def parse_document(self, file_path: str) -> Dict[str, str]:
         """
@@ -87,8 +114,12 @@ class DocumentParser:
             log.error(error_msg)
             return {"error": error_msg}
 
-    def get_supported_formats(self) -> Dict[str, List[str]]:
-        """返回支持的文件格式列表"""
+    def get_supported_formats(self) -> Dict[str, FrozenSet[str]]:
+        """返回支持的文件格式映射
+
+        返回的是类级共享字典本身（未拷贝）：值为frozenset不可改，
+        但外层dict可变，调用方只读使用、不得增删键。
+        """
         return self.SUPPORTED_FORMATS
 
     def save_markdown(self, content: str, output_path: str) -> Optional[str]:
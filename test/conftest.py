@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# 统一把项目根目录加入sys.path（pytest收集时执行一次），
+# 各测试模块不再各自append，避免importlib反复扫描重复路径项
+sys.path.insert(0, str(Path(__file__).parent.parent))
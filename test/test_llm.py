@@ -0,0 +1,61 @@
+import os
+import unittest
+from unittest import mock
+
+# 单元测试用的最小配置，不依赖真实的config.yaml
+TEST_CONFIG = {'xai': {'api_key': 'test-key', 'cache_enabled': False}}
+
+class TestLLMService(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """整个测试类共享一个服务实例，单元用例不发起网络请求
+
+        core.llm的导入推迟到这里：它会连带拉起requests/urllib3整栈，
+        放在模块顶层会拖慢收集阶段（xdist下每个worker都要导一遍）。
+        """
+        from core.llm import LLMService, ChatResponse
+        cls.LLMService = LLMService
+        cls.ChatResponse = ChatResponse
+        cls.service = LLMService(TEST_CONFIG)
+
+    def test_chat_with_system_custom_system_content(self):
+        """chat_with_system应按 system, user 顺序组装消息（chat被stub）"""
+        with mock.patch.object(
+            self.LLMService, 'chat',
+            return_value=self.ChatResponse(text="stub", raw_response={})
+        ) as chat_mock:
+            response = self.service.chat_with_system("hello", system_content="自定义系统提示")
+
+        self.assertEqual(response.text, "stub")
+        messages = chat_mock.call_args[0][0]
+        self.assertEqual([msg.role for msg in messages], ["system", "user"])
+        self.assertEqual(messages[0].content, "自定义系统提示")
+        self.assertEqual(messages[1].content, "hello")
+
+    def test_chat_with_system_default_system_content(self):
+        """不传system_content时应回落到配置中的默认值"""
+        with mock.patch.object(
+            self.LLMService, 'chat',
+            return_value=self.ChatResponse(text="stub", raw_response={})
+        ) as chat_mock:
+            self.service.chat_with_system("hello")
+
+        messages = chat_mock.call_args[0][0]
+        self.assertEqual(messages[0].content, self.service.system_content)
+
+    @unittest.skipUnless(os.getenv('RUN_LIVE_TESTS'), "set RUN_LIVE_TESTS=1 to hit the real LLM gateway")
+    def test_chat_with_system_integration(self):
+        """真实调用LLM网关的集成测试（默认跳过）
+
+        瞬时429/5xx由Session适配器上的指数退避重试透明处理，
+        这里无需再包一层重试。
+        """
+        from utils.config_loader import load_config
+        service = self.LLMService(load_config())
+        response = service.chat_with_system("hello")
+        self.assertIsNone(response.error)
+        self.assertIsInstance(response.text, str)
+        self.assertTrue(response.text)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
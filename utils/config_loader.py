@@ -1,15 +1,109 @@
 # utils/config_loader.py
 
+import copy
 import yaml
 import os
 import logging
+from pathlib import Path
 
 # 获取logger
 log = logging.getLogger(__name__)
 
+# 优先使用libyaml的C解析器，比纯Python实现快数倍；
+# PyYAML未带C扩展编译时回退并记录一次，便于发现性能退化
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeLoader as _Loader
+    log.info("libyaml (CSafeLoader) not available, falling back to pure-Python YAML parser")
+
 # 配置文件默认路径
 DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(__file__), '..', 'config', 'config.yaml')
 
+# 已解析配置的进程内缓存，键为(绝对路径, mtime_ns)：
+# 文件未改动时重复调用直接复用解析结果，不再读盘和跑YAML解析
+_CACHE = {}
+
+# groq配置的默认值，schema路径与回退路径共用一份定义
+_GROQ_DEFAULTS = {
+    'model': 'whisper-large-v3-turbo',
+    'language': 'zh',
+    'prompt': '',
+    'temperature': 0.1,
+}
+
+# msgspec为可选依赖：可用时在YAML旁维护一个msgpack侧车缓存，
+# 冷启动解码耗时降到亚毫秒级；缺失时始终走YAML解析
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+# fastjsonschema为可选依赖：导入时一次性codegen出校验函数，结构检查
+# 和默认值填充变成一串直线代码；缺失时回退到等价的Python检查
+try:
+    import fastjsonschema
+    _validate_config = fastjsonschema.compile({
+        'type': 'object',
+        'required': ['groq'],
+        'properties': {
+            'groq': {
+                'type': 'object',
+                'properties': {
+                    key: {'default': value} for key, value in _GROQ_DEFAULTS.items()
+                }
+            }
+        }
+    }, use_default=True)
+except ImportError:
+    def _validate_config(config):
+        if 'groq' not in config or not isinstance(config['groq'], dict):
+            raise ValueError("配置中缺少 'groq' 部分")
+        for key, value in _GROQ_DEFAULTS.items():
+            config['groq'].setdefault(key, value)
+        return config
+
+def _sidecar_path(config_path: str) -> str:
+    """YAML对应的msgpack侧车缓存路径"""
+    return config_path + '.cache.msgpack'
+
+def _load_sidecar(config_path: str):
+    """读取msgpack侧车缓存；缺失、过期或损坏时返回None走YAML解析
+
+    侧车存的是校验并填充默认值之后的配置，mtime不早于YAML即视为有效，
+    YAML一经修改自动失效。
+    """
+    if msgspec is None:
+        return None
+    sidecar = _sidecar_path(config_path)
+    try:
+        if os.stat(sidecar).st_mtime_ns < os.stat(config_path).st_mtime_ns:
+            return None
+        return msgspec.msgpack.decode(Path(sidecar).read_bytes())
+    except (OSError, msgspec.DecodeError):
+        return None
+
+def _write_sidecar(config_path: str, config: dict) -> None:
+    """YAML解析成功后重写侧车缓存，供下次冷启动跳过YAML解析"""
+    if msgspec is None:
+        return
+    try:
+        Path(_sidecar_path(config_path)).write_bytes(msgspec.msgpack.encode(config))
+    except (OSError, TypeError) as e:
+        log.debug(f"Skipping config sidecar cache write: {e}")
+
+def _apply_overrides(config: dict) -> dict:
+    """应用环境变量覆盖（环境变量优先于配置文件）
+
+    独立成函数并在冷热两条路径上都执行：缓存命中时也能反映
+    GROQ_API_KEY的变化（如按租户轮换密钥），无需碰磁盘重新解析。
+    """
+    if os.environ.get("GROQ_API_KEY"):
+        config['groq']['api_key'] = os.environ["GROQ_API_KEY"]
+    elif 'api_key' not in config['groq']:
+        raise ValueError("未找到Groq API密钥，请在配置文件中设置或通过GROQ_API_KEY环境变量提供")
+    return config
+
 def load_config(config_path: str = DEFAULT_CONFIG_PATH) -> dict:
     """
     加载YAML配置文件，支持环境变量覆盖。
@@ -21,36 +115,45 @@ def load_config(config_path: str = DEFAULT_CONFIG_PATH) -> dict:
         dict: 配置字典
     """
     try:
-        # 检查配置文件是否存在
-        if not os.path.exists(config_path):
-            raise FileNotFoundError(f"配置文件未找到: {config_path}")
-
-        # 读取YAML文件
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
-            
-        if not isinstance(config, dict):
-            raise ValueError("配置文件格式错误，应为YAML字典格式")
-
-        # 处理Groq配置
-        if 'groq' not in config:
-            raise ValueError("配置中缺少 'groq' 部分")
+        # mtime变化时缓存键失效，自动触发重新解析。
+        # 这里的stat同时承担存在性检查：不再提前os.path.exists，
+        # 少一次stat系统调用，也消除了检查与读取之间的竞态
+        try:
+            cache_key = (os.path.abspath(config_path), os.stat(config_path).st_mtime_ns)
+        except FileNotFoundError as e:
+            raise FileNotFoundError(f"配置文件未找到: {config_path}") from e
+        cached = _CACHE.get(cache_key)
+        if cached is not None:
+            # 返回深拷贝，保持调用方可自由修改返回字典的语义；
+            # 环境变量覆盖在拷贝上重新应用，热路径也感知env变化
+            return _apply_overrides(copy.deepcopy(cached))
 
-        # 环境变量优先于配置文件
-        if os.environ.get("GROQ_API_KEY"):
-            config['groq']['api_key'] = os.environ["GROQ_API_KEY"]
-        elif 'api_key' not in config['groq']:
-            raise ValueError("未找到Groq API密钥，请在配置文件中设置或通过GROQ_API_KEY环境变量提供")
+        # 冷启动优先读msgpack侧车缓存（已校验、已填默认值），
+        # 命中则完全跳过YAML解析
+        config = _load_sidecar(config_path)
+        if config is None:
+            # 以字节读取，UTF-8解码交给解析器在C层完成，
+            # 省掉文本模式下Python层的一次完整解码和缓冲包装
+            config = yaml.load(Path(config_path).read_bytes(), Loader=_Loader)
 
-        # 设置默认值
-        config['groq'].setdefault('model', 'whisper-large-v3-turbo')
-        config['groq'].setdefault('language', 'zh')
-        config['groq'].setdefault('prompt', '')
-        config['groq'].setdefault('temperature', 0.1)
+            if not isinstance(config, dict):
+                raise ValueError("配置文件格式错误，应为YAML字典格式")
 
-        return config
+            # 结构校验并填充默认值
+            _validate_config(config)
+            _write_sidecar(config_path, config)
+
+        # 缓存未应用环境变量覆盖的版本，覆盖统一在返回前应用
+        _CACHE[cache_key] = copy.deepcopy(config)
+        return _apply_overrides(config)
 
     except Exception as e:
         log.error(f"加载配置时出错: {str(e)}")
         raise
         # 直接使用默认配置文件
+
+def _cache_clear():
+    """清空已解析配置缓存（主要供测试使用）"""
+    _CACHE.clear()
+
+load_config.cache_clear = _cache_clear